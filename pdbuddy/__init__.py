@@ -1,35 +1,83 @@
 """Python bindings for PD Buddy Sink configuration"""
 
 from collections import namedtuple
-
-try:
-    # Try importing enum from the standard library
-    import enum
-    # Make sure Flag is available
-    enum.Flag
-except (ImportError, NameError, AttributeError):
-    # If something above failed, try aenum instead
-    import aenum as enum
+import enum
+import os
+import time
 
 import serial
-import serial.tools.list_ports
+
+# The prompt printed by the PD Buddy Sink shell when it's ready for a command
+_PROMPT = b"PDBS) "
+# The line ending used by the PD Buddy Sink shell
+_CRLF = b"\r\n"
+# Appended to the first word of a command that the shell didn't recognize
+_UNK_SUFFIX = b" ?"
 
 
 class Sink:
-    """Interface for configuring a PD Buddy Sink"""
+    """Interface for configuring a PD Buddy Sink
+
+    By default, opening a Sink on Linux asks the kernel to use a 1 ms
+    latency timer for the USB serial adapter, so short responses aren't held
+    back for up to 16 ms.  Pass ``low_latency=False`` to leave it alone.
+    On Windows, the equivalent for FTDI adapters is the ``LatencyTimer``
+    value under the device's FTDIBUS registry key, which has to be set
+    outside of this library.
+    """
     vid = 0x1209
     pid = 0x9DB5
 
-    def __init__(self, sp):
+    # How long in seconds the results of a device enumeration are reused
+    device_cache_ttl = 2.0
+    # Results of the last device enumeration for each VID:PID pattern, as
+    # (timestamp, list) tuples.  Keying by pattern keeps subclasses with
+    # their own vid and pid from seeing each other's devices.
+    _device_cache = {}
+
+    # Serial ports left open by closed pooled Sinks, keyed by device
+    _pool = {}
+
+    def __init__(self, sp, low_latency=True, pooled=False):
         """Open a serial port to communicate with the PD Buddy Sink
+
+        If ``pooled`` is True, closing the Sink keeps its serial port open
+        so the next pooled Sink for the same device can skip opening the
+        port and resetting the shell.  Only use this while the device stays
+        plugged in, and call `Sink.shutdown_pool` when done.
         
         :param sp: the serial port of the device
+        :param low_latency: whether to try to reduce the latency timer of the
+            USB serial adapter to 1 ms
+        :param pooled: whether to reuse the serial port across Sinks
         :type sp: str or `serial.tools.list_ports.ListPortInfo`
+        :type low_latency: bool
+        :type pooled: bool
         """
+        device = getattr(sp, "device", sp)
+        self._pooled = pooled
+        self._clean = False
+        self._closed = False
+
+        if pooled:
+            port = self._pool.pop(device, None)
+            if port is not None and port.is_open:
+                # The port was waiting at a prompt when it was put in the pool,
+                # so it's ready to use as-is
+                self._port = port
+                self._clean = True
+                return
+
         try:
-            self._port = serial.Serial(sp, baudrate=115200)
-        except ValueError:
-            self._port = serial.Serial(sp.device, baudrate=115200)
+            self._port = serial.Serial(device, baudrate=115200, timeout=1.0)
+        except serial.SerialException:
+            # The device may have been unplugged, so the cached device list
+            # can't be trusted anymore
+            self.invalidate_device_cache()
+            raise
+
+        if low_latency:
+            self._set_low_latency()
 
         # Put communications in a known state, cancelling any partially-entered
         # command that may be sitting in the buffer.
@@ -39,7 +87,30 @@ class Sink:
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._port.close()
+        self.close()
+
+    def _set_low_latency(self):
+        """Try to set the latency timer of the USB serial adapter to 1 ms
+
+        Adapters with a latency timer (e.g. FTDI) wait 16 ms by default
+        before sending a partial packet, which adds up quickly for short
+        responses.  This only works on Linux; any errors are ignored.
+        """
+        # pySerial >= 3.5 can do this with the ASYNC_LOW_LATENCY flag
+        try:
+            self._port.set_low_latency_mode(True)
+            return
+        except (AttributeError, NotImplementedError, ValueError, OSError):
+            pass
+
+        # Otherwise, try setting the latency timer directly
+        path = os.path.join("/sys/bus/usb-serial/devices",
+                os.path.basename(self._port.name), "latency_timer")
+        try:
+            with open(path, "w") as f:
+                f.write("1")
+        except OSError:
+            pass
 
     def send_command(self, cmd, newline=True):
         """Send a command to the PD Buddy Sink, returning the result
@@ -55,30 +126,128 @@ class Sink:
         # Build the command
         cmd = cmd.encode("utf-8")
         if newline:
-            cmd += b"\r\n"
+            cmd += _CRLF
 
-        # Send the command
+        # Send the command.  There's no need to flush it, since reading the
+        # result waits for the Sink to have received it anyway.
+        self._clean = False
         self._port.write(cmd)
-        self._port.flush()
 
         # Read the result
-        answer = b""
-        while not answer.endswith(b"PDBS) "):
-            answer += self._port.read(1)
-        answer = answer.split(b"\r\n")
+        return self._parse_answer(cmd, self._read_answer())
+
+    def send_commands(self, cmds, pipeline=True):
+        """Send several commands to the PD Buddy Sink, returning the results
 
+        By default, all the commands are written at once before any of the
+        results are read, saving a round trip for each command after the
+        first.  Note that this means every command is run, even if an earlier
+        one fails.
+
+        With ``pipeline`` False, each command is sent with `send_command`
+        in turn, so a command that isn't recognized raises KeyError before
+        any of the commands after it are sent.
+
+        :param cmds: the commands to send to the Sink
+        :param pipeline: whether to write all the commands at once, rather
+            than sending each one with `send_command` in turn
+        :type cmds: list of str
+        :type pipeline: bool
+
+        :returns: a list with one item per command, each being a list of zero
+            or more bytes objects as returned by `send_command`.
+        """
+        if not pipeline:
+            return [self.send_command(cmd) for cmd in cmds]
+
+        if not cmds:
+            return []
+
+        # Build the commands
+        cmds = [cmd.encode("utf-8") for cmd in cmds]
+
+        # Send the commands
+        self._clean = False
+        self._port.write(_CRLF.join(cmds) + _CRLF)
+
+        # Read the results, splitting them at the prompt printed after each
+        # command
+        answers = self._read_answer(len(cmds)).split(_PROMPT)[-len(cmds)-1:-1]
+
+        return [self._parse_answer(cmd, answer)
+                for cmd, answer in zip(cmds, answers)]
+
+    def _read_answer(self, prompts=1):
+        """Read from the PD Buddy Sink until it has printed enough prompts
+
+        :param prompts: the number of prompts to wait for
+        :type prompts: int
+
+        :returns: a bytes object containing everything read, ending with the
+            last prompt.
+
+        :raises: TimeoutError
+        """
+        # Wait for the first byte, then grab everything that's already
+        # buffered at once until the prompts have been received.
+        answer = bytearray()
+        while not (answer.endswith(_PROMPT)
+                and answer.count(_PROMPT) >= prompts):
+            data = self._port.read(self._port.in_waiting or 1)
+            # Nothing at all arriving within the port's timeout means the
+            # Sink isn't answering, so give up rather than waiting forever
+            if not data:
+                raise TimeoutError("no answer from the PD Buddy Sink")
+            answer.extend(data)
+        self._clean = True
+        return bytes(answer)
+
+    @staticmethod
+    def _parse_answer(cmd, answer):
+        """Split the response to a command into lines
+
+        :param cmd: the command as it was sent to the Sink
+        :param answer: the text printed in response to the command
+        :type cmd: bytes
+        :type answer: bytes
+
+        :returns: a list of zero or more bytes objects, each being one line
+            printed as a response to the command.
+        """
         # Remove the echoed command and prompt
-        answer = answer[1:-1]
+        answer = answer.split(_CRLF)[1:-1]
 
         # Raise an exception if the command wasn't recognized
-        if len(answer) and answer[0] == cmd.strip().split()[0] + b" ?":
+        if answer and answer[0] == cmd.split(None, 1)[0] + _UNK_SUFFIX:
             raise KeyError("command not found")
 
         return answer
 
     def close(self):
-        """Close the serial port"""
-        self._port.close()
+        """Close the serial port
+
+        For a pooled Sink that's waiting at a prompt, the port is put in the
+        pool instead.  Closing a Sink that's already closed does nothing.
+        """
+        # A pooled port may belong to another Sink by now, so never touch it
+        # twice
+        if self._closed:
+            return
+        self._closed = True
+
+        port = self._port
+        if self._pooled and self._clean and port.is_open:
+            # Only pool the port if there isn't one for this device already
+            if self._pool.setdefault(port.port, port) is port:
+                return
+        port.close()
+
+    @classmethod
+    def shutdown_pool(cls):
+        """Close all the serial ports kept open by pooled Sinks"""
+        for port in cls._pool.values():
+            port.close()
+        cls._pool.clear()
 
     def help(self):
         """Returns the help text from the PD Buddy Sink"""
@@ -92,7 +261,8 @@ class Sink:
         """Runs the PD Buddy Sink's DFU bootloader and closes the serial port"""
         self._port.write(b"boot\r\n")
         self._port.flush()
-        self.close()
+        # The Sink is going away, so never put the port in the pool
+        self._port.close()
 
     def erase(self):
         """Synchronously erases all stored configuration from flash"""
@@ -108,7 +278,7 @@ class Sink:
         :raises: KeyError
         """
         text = self.send_command("load")
-        if len(text) > 0 and text[0].startswith(b"No configuration"):
+        if text and text[0].startswith(b"No configuration"):
             raise KeyError("no configuration")
 
     def get_cfg(self, index=None):
@@ -151,7 +321,7 @@ class Sink:
         out = self.send_command("set_v {}".format(mv))
         # If that command gave any output, that indicates an error.  Raise an
         # exception to make that clear.
-        if len(out):
+        if out:
             raise ValueError(out[0])
 
     def set_vrange(self, vmin, vmax):
@@ -163,7 +333,7 @@ class Sink:
         out = self.send_command("set_vrange {} {}".format(vmin, vmax))
         # If that command gave any output, that indicates an error.  Raise an
         # exception to make that clear.
-        if len(out):
+        if out:
             raise ValueError(out[0])
 
     def set_i(self, ma):
@@ -171,7 +341,7 @@ class Sink:
         out = self.send_command("set_i {}".format(ma))
         # If that command gave any output, that indicates an error.  Raise an
         # exception to make that clear.
-        if len(out):
+        if out:
             raise ValueError(out[0])
 
     def set_p(self, mw):
@@ -179,7 +349,7 @@ class Sink:
         out = self.send_command("set_p {}".format(mw))
         # If that command gave any output, that indicates an error.  Raise an
         # exception to make that clear.
-        if len(out):
+        if out:
             raise ValueError(out[0])
 
     def set_r(self, mr):
@@ -187,7 +357,7 @@ class Sink:
         out = self.send_command("set_r {}".format(mr))
         # If that command gave any output, that indicates an error.  Raise an
         # exception to make that clear.
-        if len(out):
+        if out:
             raise ValueError(out[0])
 
     def identify(self):
@@ -222,43 +392,123 @@ class Sink:
         """Gets the most recent Source_Capabilities read by the Sink"""
         return read_pdo_list(self.send_command("get_source_cap"))
 
-    def set_tmpcfg(self, sc):
+    def set_tmpcfg(self, sc, pipeline=True):
         """Writes a SinkConfig object to the device's configuration buffer
         
         Note: the value of the status field is ignored; it will always be
         `SinkStatus.VALID`.
+
+        If ``pipeline`` is True, every command is run even if an earlier one
+        fails, and the first error is raised afterwards.  Otherwise the
+        commands are sent one at a time, stopping at the first error.
+
+        :param sc: the configuration to write
+        :param pipeline: whether to send all the commands at once (see
+            `send_commands`)
+        :type sc: `SinkConfig`
+        :type pipeline: bool
+
+        :raises: ValueError
         """
+        # Reject values that are never valid without talking to the Sink.
+        # Limits that depend on the firmware are left for the Sink to check.
+        if sc.flags is None:
+            raise ValueError("flags must not be None")
+        for field in ("v", "vmin", "vmax", "i"):
+            value = getattr(sc, field)
+            if value is not None and value < 0:
+                raise ValueError("{} must not be negative".format(field))
+        if sc.vmin is not None and sc.vmax is not None and sc.vmin > sc.vmax:
+            raise ValueError("vmin must not be greater than vmax")
+
         # Set flags
-        self.clear_flags()
+        cmds = ["clear_flags"]
         if sc.flags & SinkFlags.GIVEBACK:
-            self.toggle_giveback()
+            cmds.append("toggle_giveback")
         if sc.flags & SinkFlags.HV_PREFERRED:
-            self.toggle_hv_preferred()
+            cmds.append("toggle_hv_preferred")
 
         # Set voltage
-        self.set_v(sc.v)
+        cmds.append("set_v {}".format(sc.v))
 
-        # Set voltage range
-        self.set_vrange(sc.vmin, sc.vmax)
+        # Set voltage range, making sure we're sending numbers to the Sink in
+        # all valid cases
+        if sc.vmin is None and sc.vmax is None:
+            cmds.append("set_vrange 0 0")
+        else:
+            cmds.append("set_vrange {} {}".format(sc.vmin, sc.vmax))
 
         if sc.idim is SinkDimension.CURRENT:
             # Set current
-            self.set_i(sc.i)
+            cmds.append("set_i {}".format(sc.i))
         elif sc.idim is SinkDimension.POWER:
             # Set power
-            self.set_p(sc.i)
+            cmds.append("set_p {}".format(sc.i))
         elif sc.idim is SinkDimension.RESISTANCE:
             # Set resistance
-            self.set_r(sc.i)
+            cmds.append("set_r {}".format(sc.i))
+
+        # Send the commands, either all at once or lazily one at a time so
+        # nothing more is sent after an error.  If any of them gave any
+        # output, that indicates an error.  Raise an exception to make that
+        # clear.
+        if pipeline:
+            outs = self.send_commands(cmds)
+        else:
+            outs = (self.send_command(cmd) for cmd in cmds)
+        for out in outs:
+            if out:
+                raise ValueError(out[0])
+
+    def write_cfg(self, sc, pipeline=True):
+        """Writes a SinkConfig object to flash and reads it back
+
+        This does the same as calling `set_tmpcfg`, `write`, and `get_cfg` in
+        turn, but in two round trips: one to set the configuration buffer,
+        and one to write it to flash and read it back.  Flash is only written
+        if the configuration buffer was set without errors.
+
+        :param sc: the configuration to write
+        :param pipeline: whether to send the commands of each round trip at
+            once (see `send_commands`)
+        :type sc: `SinkConfig`
+        :type pipeline: bool
+
+        :returns: the `SinkConfig` read back from flash
+        """
+        self.set_tmpcfg(sc, pipeline=pipeline)
+
+        _, cfg = self.send_commands(["write", "get_cfg"], pipeline=pipeline)
+
+        return SinkConfig.from_text(cfg)
+
+    @classmethod
+    def invalidate_device_cache(cls):
+        """Make the next call to `get_devices` enumerate devices again"""
+        cls._device_cache.clear()
 
     @classmethod
     def get_devices(cls):
         """Get an iterable of PD Buddy Sink devices
+
+        Enumerating serial ports can be slow, so the result is reused for
+        calls made within `Sink.device_cache_ttl` seconds of each other.
+        Call `Sink.invalidate_device_cache` to force a fresh enumeration,
+        e.g. when a device is known to have been connected or disconnected.
         
         :returns: an iterable of `serial.tools.list_ports.ListPortInfo` objects
         """
-        return serial.tools.list_ports.grep("{:04X}:{:04X}".format(cls.vid,
-            cls.pid))
+        pattern = "{:04X}:{:04X}".format(cls.vid, cls.pid)
+        timestamp, devices = cls._device_cache.get(pattern, (0.0, None))
+        now = time.monotonic()
+        if devices is None or now - timestamp >= cls.device_cache_ttl:
+            # Importing list_ports pulls in platform-specific enumeration
+            # code, so only do it when it's actually needed
+            from serial.tools import list_ports
+            devices = list(list_ports.grep(pattern))
+            cls._device_cache[pattern] = (now, devices)
+        # Hand out an iterator so callers can't modify the cached list
+        return iter(devices)
 
 
 class SinkConfig(namedtuple("SinkConfig", "status flags v vmin vmax i idim")):
@@ -268,55 +518,49 @@ class SinkConfig(namedtuple("SinkConfig", "status flags v vmin vmax i idim")):
     more `SinkFlags` values.  ``v``, ``vmin``, and ``vmax`` are voltages in
     millivolts, ``i`` is the value used to set current in the appropriate
     milli- SI unit, and ``idim`` is the dimension of ``i``.  `None` is also
-    an acceptible value for any of the fields.
+    an acceptible value for any of the fields, and is the default for any
+    that aren't given.
     """
     __slots__ = ()
 
+    def __new__(cls, status=None, flags=None, v=None, vmin=None, vmax=None,
+            i=None, idim=None):
+        return super().__new__(cls, status, flags, v, vmin, vmax, i, idim)
+
     def __str__(self):
         """Print the SinkStatus in the manner of the configuration shell"""
-        s = ""
+        lines = []
 
         if self.status is not None:
-            s += "status: "
-            if self.status is SinkStatus.EMPTY:
-                s += "empty"
-            elif self.status is SinkStatus.VALID:
-                s += "valid"
-            elif self.status is SinkStatus.INVALID:
-                s += "invalid"
-            s += "\n"
+            lines.append("status: " + _STATUS_STR.get(self.status, ""))
 
         if self.flags is not None:
-            s += "flags: "
             if self.flags is SinkFlags.NONE:
-                s += "(none)"
+                flags = "(none)"
             else:
-                if self.flags & SinkFlags.GIVEBACK:
-                    s += "GiveBack"
-                if self.flags & SinkFlags.HV_PREFERRED:
-                    s += "HV_Preferred"
-            s += "\n"
+                flags = " ".join(name for flag, name in _FLAG_STR
+                        if self.flags & flag)
+            lines.append("flags: " + flags)
 
         if self.v is not None:
-            s += "v: {:.3f} V\n".format(self.v / 1000.0)
+            lines.append("v: {:.3f} V".format(self.v / 1000.0))
 
         if self.vmin is not None:
-            s += "vmin: {:.3f} V\n".format(self.vmin / 1000.0)
+            lines.append("vmin: {:.3f} V".format(self.vmin / 1000.0))
 
         if self.vmax is not None:
-            s += "vmax: {:.3f} V\n".format(self.vmax / 1000.0)
+            lines.append("vmax: {:.3f} V".format(self.vmax / 1000.0))
 
         if self.i is not None:
             if self.idim is SinkDimension.CURRENT:
-                s += "i: {:.2f} A\n".format(self.i / 1000.0)
+                lines.append("i: {:.2f} A".format(self.i / 1000.0))
             if self.idim is SinkDimension.POWER:
-                s += "p: {:.2f} W\n".format(self.i / 1000.0)
+                lines.append("p: {:.2f} W".format(self.i / 1000.0))
             if self.idim is SinkDimension.RESISTANCE:
-                s += "r: {:.2f} \u03A9\n".format(self.i / 1000.0)
+                lines.append("r: {:.2f} \u03A9".format(self.i / 1000.0))
 
-        # Return all but the last character of s to remove the trailing newline
-        if s:
-            return s[:-1]
+        if lines:
+            return "\n".join(lines)
         else:
             return "No configuration"
 
@@ -330,75 +574,52 @@ class SinkConfig(namedtuple("SinkConfig", "status flags v vmin vmax i idim")):
 
         :raises: IndexError
         """
-        # Assume the parameters will all be None
-        status = None
-        flags = None
-        v = None
-        vmin = None
-        vmax = None
-        i = None
-        idim = None
+        # Any fields that aren't found will be left as None
+        fields = {}
 
         # Iterate over all lines of text
         for line in text:
+            # Look up the field this line sets, if any
+            key, _, value = line.partition(b": ")
+            parser = _CFG_FIELDS.get(key)
+            if parser is not None:
+                field, parse, idim = parser
+                fields[field] = parse(value)
+                if idim is not None:
+                    fields["idim"] = idim
             # If the configuration said invalid index, raise an IndexError
-            if line.startswith(b"Invalid index"):
+            elif line.startswith(b"Invalid index"):
                 raise IndexError("configuration index out of range")
             # If there is no configuration, return an empty SinkConfig
             elif line.startswith(b"No configuration"):
-                return cls(None, None, None, None, None, None, None)
-            # If this line is the status field
-            elif line.startswith(b"status: "):
-                line = line.split()[1:]
-                if line[0] == b"empty":
-                    status = SinkStatus.EMPTY
-                elif line[0] == b"valid":
-                    status = SinkStatus.VALID
-                elif line[0] == b"invalid":
-                    status = SinkStatus.INVALID
-            # If this line is the flags field
-            elif line.startswith(b"flags: "):
-                line = line.split()[1:]
-                flags = SinkFlags.NONE
-                for word in line:
-                    if word == b"(none)":
-                        # If there are no flags set, stop looking
-                        break
-                    elif word == b"GiveBack":
-                        flags |= SinkFlags.GIVEBACK
-                    elif word == b"HV_Preferred":
-                        flags |= SinkFlags.HV_PREFERRED
-            # If this line is the v field
-            elif line.startswith(b"v: "):
-                word = line.split()[1]
-                v = round(1000*float(word))
-            # If this line is the vmin field
-            elif line.startswith(b"vmin: "):
-                word = line.split()[1]
-                vmin = round(1000*float(word))
-            # If this line is the vmax field
-            elif line.startswith(b"vmax: "):
-                word = line.split()[1]
-                vmax = round(1000*float(word))
-            # If this line is the i field
-            elif line.startswith(b"i: "):
-                word = line.split()[1]
-                i = round(1000*float(word))
-                idim = SinkDimension.CURRENT
-            # If this line is the p field
-            elif line.startswith(b"p: "):
-                word = line.split()[1]
-                i = round(1000*float(word))
-                idim = SinkDimension.POWER
-            # If this line is the r field
-            elif line.startswith(b"r: "):
-                word = line.split()[1]
-                i = round(1000*float(word))
-                idim = SinkDimension.RESISTANCE
+                return cls()
 
         # Create a new SinkConfig object with the values we just read
-        return cls(status=status, flags=flags, v=v, vmin=vmin, vmax=vmax, i=i,
-                idim=idim)
+        return cls(**fields)
+
+    @classmethod
+    def from_text_many(cls, text):
+        """Creates SinkConfigs from a transcript of a shell session
+
+        The transcript is split at each prompt, and every answer to a
+        ``get_cfg`` or ``get_tmpcfg`` command is loaded with `from_text`.
+        Answers to other commands are skipped, as is anything after the last
+        prompt.
+
+        :param text: everything read from the Sink, including the echoed
+            commands and the prompts
+        :type text: bytes
+        :returns: an iterator of new `SinkConfig` objects, in the order they
+            appear in the transcript.
+
+        :raises: IndexError
+        """
+        for answer in text.split(_PROMPT)[:-1]:
+            # The first line is the echoed command, and the last is empty
+            lines = answer.split(_CRLF)
+            command = lines[0].split()
+            if command and command[0] in (b"get_cfg", b"get_tmpcfg"):
+                yield cls.from_text(lines[1:-1])
 
 
 class SinkStatus(enum.Enum):
@@ -422,6 +643,80 @@ class SinkFlags(enum.Flag):
     HV_PREFERRED = enum.auto()
 
 
+def _parse_milli(value):
+    """Parse a value printed by the configuration shell in milli- units"""
+    word = value.split()[0]
+    negative = word.startswith(b"-")
+    if negative:
+        word = word[1:]
+
+    # The shell prints fixed-point numbers, so parse them with integer
+    # arithmetic rather than going through float and round.  That's only
+    # exact up to three decimals; anything finer has to be rounded.
+    whole, _, frac = word.partition(b".")
+    if whole.isdigit() and (frac.isdigit() or not frac) and len(frac) <= 3:
+        milli = int(whole) * 1000 + int((frac + b"000")[:3])
+    else:
+        # Fall back on float for anything more unusual
+        milli = round(1000*float(word))
+
+    if negative:
+        return -milli
+    return milli
+
+
+def _parse_status(value):
+    """Parse the status field printed by the configuration shell"""
+    return _STATUS_MAP.get(value.strip())
+
+
+def _parse_flags(value):
+    """Parse the flags field printed by the configuration shell"""
+    flags = SinkFlags.NONE
+    for word in value.split():
+        flags |= _FLAG_MAP.get(word, SinkFlags.NONE)
+    return flags
+
+
+_STATUS_MAP = {
+    b"empty": SinkStatus.EMPTY,
+    b"valid": SinkStatus.VALID,
+    b"invalid": SinkStatus.INVALID,
+}
+
+_FLAG_MAP = {
+    b"GiveBack": SinkFlags.GIVEBACK,
+    b"HV_Preferred": SinkFlags.HV_PREFERRED,
+}
+
+# The names SinkConfig.__str__ prints for each status, and for each flag in
+# the order they're printed
+_STATUS_STR = {
+    SinkStatus.EMPTY: "empty",
+    SinkStatus.VALID: "valid",
+    SinkStatus.INVALID: "invalid",
+}
+
+_FLAG_STR = (
+    (SinkFlags.GIVEBACK, "GiveBack"),
+    (SinkFlags.HV_PREFERRED, "HV_Preferred"),
+)
+
+# Maps the name of each field printed by the configuration shell to the
+# SinkConfig field it sets, a function to parse its value, and the
+# SinkDimension it implies (if any)
+_CFG_FIELDS = {
+    b"status": ("status", _parse_status, None),
+    b"flags": ("flags", _parse_flags, None),
+    b"v": ("v", _parse_milli, None),
+    b"vmin": ("vmin", _parse_milli, None),
+    b"vmax": ("vmax", _parse_milli, None),
+    b"i": ("i", _parse_milli, SinkDimension.CURRENT),
+    b"p": ("i", _parse_milli, SinkDimension.POWER),
+    b"r": ("i", _parse_milli, SinkDimension.RESISTANCE),
+}
+
+
 class UnknownPDO(namedtuple("UnknownPDO", "value")):
     """A PDO of an unknown type
 
@@ -452,35 +747,26 @@ class SrcFixedPDO(namedtuple("SrcFixedPDO", "dual_role_pwr usb_suspend "
 
     pdo_type = "fixed"
 
+    # Values of the fields the configuration shell leaves out when they're
+    # not set (n.b. there are none for v and i), in the order it prints them
+    _defaults = dict(dual_role_pwr=False, usb_suspend=False,
+            unconstrained_pwr=False, usb_comms=False, dual_role_data=False,
+            unchunked_ext_msg=False, peak_i=0)
+
     def __str__(self):
         """Print the SrcFixedPDO in the manner of the configuration shell"""
-        s = self.pdo_type + "\n"
+        lines = [self.pdo_type]
 
-        if self.dual_role_pwr:
-            s += "\tdual_role_pwr: 1\n"
+        # The optional fields are only printed when they're set
+        for field in self._defaults:
+            value = getattr(self, field)
+            if value:
+                lines.append("\t{}: {:d}".format(field, value))
 
-        if self.usb_suspend:
-            s += "\tusb_suspend: 1\n"
+        lines.append("\tv: {:.2f} V".format(self.v / 1000.0))
+        lines.append("\ti: {:.2f} A".format(self.i / 1000.0))
 
-        if self.unconstrained_pwr:
-            s += "\tunconstrained_pwr: 1\n"
-
-        if self.usb_comms:
-            s += "\tusb_comms: 1\n"
-
-        if self.dual_role_data:
-            s += "\tdual_role_data: 1\n"
-
-        if self.unchunked_ext_msg:
-            s += "\tunchunked_ext_msg: 1\n"
-
-        if self.peak_i:
-            s += "\tpeak_i: {}\n".format(self.peak_i)
-
-        s += "\tv: {:.2f} V\n".format(self.v / 1000.0)
-        s += "\ti: {:.2f} A".format(self.i / 1000.0)
-
-        return s
+        return "\n".join(lines)
 
 
 class SrcPPSAPDO(namedtuple("SrcPPSAPDO", "vmin vmax i")):
@@ -495,13 +781,12 @@ class SrcPPSAPDO(namedtuple("SrcPPSAPDO", "vmin vmax i")):
 
     def __str__(self):
         """Print the SrcPPSAPDO in the manner of the configuration shell"""
-        s = self.pdo_type + "\n"
-
-        s += "\tvmin: {:.2f} V\n".format(self.vmin / 1000.0)
-        s += "\tvmax: {:.2f} V\n".format(self.vmax / 1000.0)
-        s += "\ti: {:.2f} A".format(self.i / 1000.0)
-
-        return s
+        return "\n".join([
+            self.pdo_type,
+            "\tvmin: {:.2f} V".format(self.vmin / 1000.0),
+            "\tvmax: {:.2f} V".format(self.vmax / 1000.0),
+            "\ti: {:.2f} A".format(self.i / 1000.0),
+        ])
 
 
 class TypeCVirtualPDO(namedtuple("TypeCVirtualPDO", "i")):
@@ -515,11 +800,39 @@ class TypeCVirtualPDO(namedtuple("TypeCVirtualPDO", "i")):
 
     def __str__(self):
         """Print the TypeCVirtualPDO in the manner of the configuration shell"""
-        s = self.pdo_type + "\n"
-
-        s += "\ti: {:.2f} A".format(self.i / 1000.0)
-
-        return s
+        return "\n".join([
+            self.pdo_type,
+            "\ti: {:.2f} A".format(self.i / 1000.0),
+        ])
+
+
+def _parse_bool(value):
+    """Parse a one-bit field printed by the configuration shell"""
+    return value == b"1"
+
+
+# Maps the name of each PDO field printed by the configuration shell to the
+# PDO field it sets and a function to parse its value
+_PDO_FIELDS = {
+    b"dual_role_pwr": ("dual_role_pwr", _parse_bool),
+    b"usb_suspend": ("usb_suspend", _parse_bool),
+    b"unconstrained_pwr": ("unconstrained_pwr", _parse_bool),
+    b"usb_comms": ("usb_comms", _parse_bool),
+    b"dual_role_data": ("dual_role_data", _parse_bool),
+    b"unchunked_ext_msg": ("unchunked_ext_msg", _parse_bool),
+    b"peak_i": ("peak_i", int),
+    b"v": ("v", _parse_milli),
+    b"vmin": ("vmin", _parse_milli),
+    b"vmax": ("vmax", _parse_milli),
+    b"i": ("i", _parse_milli),
+}
+
+# Maps the pdo_type of each kind of PDO to its class
+_PDO_TYPES = {
+    SrcFixedPDO.pdo_type: SrcFixedPDO,
+    SrcPPSAPDO.pdo_type: SrcPPSAPDO,
+    TypeCVirtualPDO.pdo_type: TypeCVirtualPDO,
+}
 
 
 def read_pdo(text):
@@ -527,316 +840,199 @@ def read_pdo(text):
     # First, determine the PDO type
     pdo_type = text[0].split(b":")[-1].strip().decode("utf-8")
 
-    if pdo_type == SrcFixedPDO.pdo_type:
-        # Set default values (n.b. there are none for v and i)
-        dual_role_pwr = False
-        usb_suspend = False
-        unconstrained_pwr = False
-        usb_comms = False
-        dual_role_data = False
-        unchunked_ext_msg = False
-        peak_i = 0
-
-        # Load a SrcFixedPDO
-        for line in text[1:]:
-            fields = line.split(b":")
-            fields[0] = fields[0].strip()
-            fields[1] = fields[1].strip()
-            if fields[0] == b"dual_role_pwr":
-                dual_role_pwr = (fields[1] == b"1")
-            elif fields[0] == b"usb_suspend":
-                usb_suspend = (fields[1] == b"1")
-            elif fields[0] == b"unconstrained_pwr":
-                unconstrained_pwr = (fields[1] == b"1")
-            elif fields[0] == b"usb_comms":
-                usb_comms = (fields[1] == b"1")
-            elif fields[0] == b"dual_role_data":
-                dual_role_data = (fields[1] == b"1")
-            elif fields[0] == b"unchunked_ext_msg":
-                unchunked_ext_msg = (fields[1] == b"1")
-            elif fields[0] == b"peak_i":
-                peak_i = int(fields[1])
-            elif fields[0] == b"v":
-                v = round(1000*float(fields[1].split()[0]))
-            elif fields[0] == b"i":
-                i = round(1000*float(fields[1].split()[0]))
-
-        # Make the SrcFixedPDO
-        return SrcFixedPDO(
-                dual_role_pwr=dual_role_pwr,
-                usb_suspend=usb_suspend,
-                unconstrained_pwr=unconstrained_pwr,
-                usb_comms=usb_comms,
-                dual_role_data=dual_role_data,
-                unchunked_ext_msg=unchunked_ext_msg,
-                peak_i=peak_i,
-                v=v,
-                i=i)
-    elif pdo_type == SrcPPSAPDO.pdo_type:
-        # Load a SrcPPSAPDO
-        for line in text[1:]:
-            fields = line.split(b":")
-            fields[0] = fields[0].strip()
-            fields[1] = fields[1].strip()
-            if fields[0] == b"vmin":
-                vmin = round(1000*float(fields[1].split()[0]))
-            if fields[0] == b"vmax":
-                vmax = round(1000*float(fields[1].split()[0]))
-            if fields[0] == b"i":
-                i = round(1000*float(fields[1].split()[0]))
-
-        # Make the SrcPPSAPDO
-        return SrcPPSAPDO(vmin=vmin, vmax=vmax, i=i)
-    elif pdo_type == TypeCVirtualPDO.pdo_type:
-        # Load a TypeCVirtualPDO
-        for line in text[1:]:
-            fields = line.split(b":")
-            fields[0] = fields[0].strip()
-            fields[1] = fields[1].strip()
-            if fields[0] == b"i":
-                i = round(1000*float(fields[1].split()[0]))
-
-        # Make the TypeCVirtualPDO
-        return TypeCVirtualPDO(i=i)
-    elif pdo_type == "No Source_Capabilities":
+    if pdo_type == "No Source_Capabilities":
         return None
-    else:
+
+    pdo_class = _PDO_TYPES.get(pdo_type)
+    if pdo_class is None:
         # Make an UnknownPDO
         return UnknownPDO(value=int(pdo_type, 16))
 
+    # Load the fields of the PDO, starting from the defaults for its type
+    fields = dict(getattr(pdo_class, "_defaults", {}))
+    for line in text[1:]:
+        key, _, value = line.partition(b":")
+        parser = _PDO_FIELDS.get(key.strip())
+        if parser is not None and parser[0] in pdo_class._fields:
+            field, parse = parser
+            fields[field] = parse(value.strip())
+
+    # Make the PDO
+    return pdo_class(**fields)
+
 
 def read_pdo_list(text):
     """Create a list of PDOs from text returned by Sink.send_command"""
-    # Get the lines where PDOs start
-    pdo_start_list = []
-    for index, line in enumerate(text):
+    # Group the lines of each PDO together, starting a new PDO at each line
+    # that isn't indented
+    pdo_texts = []
+    for line in text:
         if not line.startswith(b"\t"):
-            pdo_start_list.append(index)
-    # Append the number of lines so the last slice will work right
-    pdo_start_list.append(len(text))
+            pdo_texts.append([line])
+        elif pdo_texts:
+            pdo_texts[-1].append(line)
 
     # Read the PDOs
     pdo_list = []
-    for start, end in zip(pdo_start_list[:-1], pdo_start_list[1:]):
-        pdo = read_pdo(text[start:end])
+    for pdo_text in pdo_texts:
+        pdo = read_pdo(pdo_text)
         if pdo is not None:
             pdo_list.append(pdo)
 
     return pdo_list
 
 
-def calculate_pdp(pdo_list):
-    """Calculate the PDP in watts of a list of PDOs
+def _calculate_pdp_uw(pdo_list):
+    """Calculate the PDP in microwatts of a sequence of PDOs
 
-    The result is only guaranteed to be correct if the power supply follows
-    the USB Power Delivery standard.  Since quite a few power supplies
-    unfortunately do not, this can really only be considered an estimate.
+    Voltages and currents are integers in millivolts and milliamperes, so
+    working in microwatts keeps all the arithmetic exact.
     """
     max_power = 0
 
     # The Source Power Rules make it so the PDP can be determined by the
     # highest power available from any fixed supply PDO.
     for pdo in pdo_list:
-        if pdo.pdo_type == "fixed":
-            max_power = max(max_power, pdo.v / 1000.0 * pdo.i / 1000.0)
-        elif pdo.pdo_type == "typec_virtual":
-            max_power = max(max_power, 5.0 * pdo.i / 1000.0)
+        if pdo.pdo_type == SrcFixedPDO.pdo_type:
+            max_power = max(max_power, pdo.v * pdo.i)
+        elif pdo.pdo_type == TypeCVirtualPDO.pdo_type:
+            max_power = max(max_power, 5000 * pdo.i)
 
     return max_power
 
 
+def calculate_pdp(pdo_list):
+    """Calculate the PDP in watts of a sequence of PDOs
+
+    The result is only guaranteed to be correct if the power supply follows
+    the USB Power Delivery standard.  Since quite a few power supplies
+    unfortunately do not, this can really only be considered an estimate.
+    """
+    return _calculate_pdp_uw(pdo_list) / 1000000.0
+
+
+# The Power Rules for fixed supply PDOs.  Each rule gives the highest PDP in
+# microwatts it applies to, the voltages in millivolts which must offer at
+# least 3 A, and the voltage in millivolts which must offer the PDP.
+_FIXED_POWER_RULES = (
+    (15000000, (), 5000),
+    (27000000, (5000,), 9000),
+    (45000000, (5000, 9000), 15000),
+    (float("inf"), (5000, 9000, 15000), 20000),
+)
+
+# Maps the (vmin, vmax) in millivolts of each standard PPS APDO to its
+# nominal voltage in millivolts
+_PPS_NOMINAL_V = {
+    (3000, 5900): 5000,
+    (3000, 11000): 9000,
+    (3000, 16000): 15000,
+    (3000, 21000): 20000,
+}
+
+# The Power Rules for PPS APDOs.  Each rule gives the highest PDP in
+# microwatts it applies to, the nominal voltages in millivolts which must
+# offer at least 3 A, the nominal voltage in millivolts which must offer the
+# PDP, and the PDP in microwatts from which the 3 A APDOs become optional (or
+# None if they never do).
+_PPS_POWER_RULES = (
+    (15000000, (), 5000, None),
+    (27000000, (5000,), 9000, 27000000),
+    (45000000, (9000,), 15000, 45000000),
+    (float("inf"), (15000,), 20000, 60000000),
+)
+
+
 def follows_power_rules(pdo_list):
-    """Test whether a list of PDOs follows the Power Rules for PD 3.0
+    """Test whether a sequence of PDOs follows the Power Rules for PD 3.0
 
     This function is a false-biased approximation; that is, when it returns
     False it is definitely correct, but when it returns True it might be
     incorrect.
     """
-    # First, estimate the PDP assuming the rules are being followed
-    pdp = calculate_pdp(pdo_list)
+    # First, estimate the PDP assuming the rules are being followed.  All the
+    # powers here are integers in microwatts so they can be compared exactly.
+    pdp = _calculate_pdp_uw(pdo_list)
 
     # If there's a typec_virtual PDO, there's no Power Delivery so the Power
     # Rules cannot be violated.  In truth they're not really being followed
     # either since they only apply to Power Delivery, but returning True here
     # seems like the safer option.
-    if pdo_list and pdo_list[0].pdo_type == "typec_virtual":
+    if pdo_list and pdo_list[0].pdo_type == TypeCVirtualPDO.pdo_type:
         return True
 
-    fixed = [p for p in pdo_list if p.pdo_type == "fixed"]
-    pps = [p for p in pdo_list if p.pdo_type == "pps"]
-
-    # Make sure nothing exceeds the PDP
-    for pdo in fixed:
-        if pdp < pdo.v / 1000.0 * pdo.i / 1000.0:
-            return False
-    # TODO: in the future, there will be more types of PDO checked here
-    for pdo in pps:
-        # 5V Prog nominal PDO
-        if pdo.vmin == 3000 and pdo.vmax == 5900:
-            if pdp < 5.0 * pdo.i / 1000.0:
-                return False
-        # 9V Prog nominal PDO
-        elif pdo.vmin == 3000 and pdo.vmax == 11000:
-            if pdp < 9.0 * pdo.i / 1000.0:
-                return False
-        # 15V Prog nominal PDO
-        elif pdo.vmin == 3000 and pdo.vmax == 16000:
-            if pdp < 15.0 * pdo.i / 1000.0:
-                return False
-        # 20V Prog nominal PDO
-        elif pdo.vmin == 3000 and pdo.vmax == 21000:
-            if pdp < 20.0 * pdo.i / 1000.0:
-                return False
-        # Non-standard programmable PDO
-        else:
-            if pdp < pdo.vmax / 1000.0 * pdo.i / 1000.0:
+    # In a single pass over the list, make sure nothing exceeds the PDP, and
+    # index the fixed supply PDOs by voltage and the standard PPS APDOs by
+    # nominal voltage, keeping any duplicates so they all get checked
+    fixed_by_v = {}
+    pps_by_v = {}
+    pps = False
+    for pdo in pdo_list:
+        pdo_type = pdo.pdo_type
+        if pdo_type == SrcFixedPDO.pdo_type:
+            if pdp < pdo.v * pdo.i:
                 return False
-
-    # Check that the fixed supply PDOs look right
-    seen_5v = False
-    seen_9v = False
-    seen_15v = False
-    seen_20v = False
-    seen_normative_voltages = False
-    if pdp == 0:
-        # No power is fine
-        seen_normative_voltages = True
-    elif pdp <= 15:
-        # Below 15 W, make sure the PDP is available at 5 V.
-        for pdo in fixed:
-            if pdo.v == 5000:
-                seen_5v = True
-                if pdo.v / 1000.0 * pdo.i / 1000.0 != pdp:
-                    return False
-        seen_normative_voltages = seen_5v
-    elif pdp <= 27:
-        # Between 15 and 27 W, make sure at least 3 A is available at 5 V and
-        # the PDP is available at 9 V.
-        for pdo in fixed:
-            if pdo.v == 5000:
-                seen_5v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.v == 9000:
-                seen_9v = True
-                if pdo.v / 1000.0 * pdo.i / 1000.0 != pdp:
-                    return False
-        seen_normative_voltages = seen_5v and seen_9v
-    elif pdp <= 45:
-        # Between 27 and 45 W, make sure at least 3 A is available at 5 and
-        # 9 V, and the PDP is available at 15 V.
-        for pdo in fixed:
-            if pdo.v == 5000:
-                seen_5v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.v == 9000:
-                seen_9v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.v == 15000:
-                seen_15v = True
-                if pdo.v / 1000.0 * pdo.i / 1000.0 != pdp:
-                    return False
-        seen_normative_voltages = seen_5v and seen_9v and seen_15v
-    else:
-        # Above 45 W, make sure at least 3 A is available at 5, 9, and 15 V,
-        # and the PDP is available at 20 V.
-        for pdo in fixed:
-            if pdo.v == 5000:
-                seen_5v = True
-                if pdo.i < 3000.0:
+            fixed_by_v.setdefault(pdo.v, []).append(pdo)
+        elif pdo_type == SrcPPSAPDO.pdo_type:
+            pps = True
+            # Standard APDOs are rated at their nominal voltage, and
+            # non-standard ones at their maximum voltage.
+            nominal_v = _PPS_NOMINAL_V.get((pdo.vmin, pdo.vmax))
+            if nominal_v is None:
+                if pdp < pdo.vmax * pdo.i:
                     return False
-            elif pdo.v == 9000:
-                seen_9v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.v == 15000:
-                seen_15v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.v == 20000:
-                seen_20v = True
-                if pdo.v / 1000.0 * pdo.i / 1000.0 != pdp:
+            else:
+                if pdp < nominal_v * pdo.i:
                     return False
-        seen_normative_voltages = seen_5v and seen_9v and seen_15v and seen_20v
+                pps_by_v.setdefault(nominal_v, []).append(pdo)
+        # TODO: in the future, there will be more types of PDO checked here
+
+    # No power is fine
+    if pdp == 0:
+        return True
 
-    if not seen_normative_voltages:
+    # Check that the fixed supply PDOs look right: find the rule for our PDP,
+    # then make sure at least 3 A is available at the lower voltages it lists
+    # and the PDP is available at its highest voltage.
+    for max_pdp, min_3a_v, pdp_v in _FIXED_POWER_RULES:
+        if pdp <= max_pdp:
+            break
+    for v in min_3a_v:
+        if v not in fixed_by_v:
+            return False
+        for pdo in fixed_by_v[v]:
+            if pdo.i < 3000:
+                return False
+    if pdp_v not in fixed_by_v:
         return False
+    for pdo in fixed_by_v[pdp_v]:
+        if pdo.v * pdo.i != pdp:
+            return False
 
     # TODO: there are several things this currently doesn't test, such as
     # variable and battery PDOs.
 
-    # Check that the PPS APDOs look right
-    seen_5v = False
-    seen_9v = False
-    seen_15v = False
-    seen_20v = False
+    # Most power supplies don't offer PPS, in which case we're done
+    if not pps:
+        return True
 
-    if pdp == 0:
-        # No power is fine
-        pass
-    elif pdp <= 15:
-        # Below 15 W, make sure the PDP is available with 5V Prog.
-        for pdo in pps:
-            if pdo.vmin == 3000 and pdo.vmax == 5900:
-                seen_5v = True
-                if 5.0 * pdo.i / 1000.0 != pdp:
-                    return False
-        if pps and not seen_5v:
-            return False
-    elif pdp <= 27:
-        # Between 15 and 27 W, make sure at least 3 A is available at 5V Prog
-        # and the PDP is available at 9V Prog.
-        for pdo in pps:
-            if pdo.vmin == 3000 and pdo.vmax == 5900:
-                seen_5v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.vmin == 3000 and pdo.vmax == 11000:
-                seen_9v = True
-                if 9.0 * pdo.i / 1000.0 != pdp:
-                    return False
-                # If we're at full power for this range, 5V Prog is optional
-                if pdp == 27:
-                    seen_5v = True
-        if pps and not (seen_5v and seen_9v):
-            return False
-    elif pdp <= 45:
-        # Between 27 and 45 W, make sure at least 3 A is available at 9V Prog,
-        # and the PDP is available at 15V Prog.
-        for pdo in pps:
-            # 5V Prog is optional at this power level
-            if pdo.vmin == 3000 and pdo.vmax == 11000:
-                seen_9v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.vmin == 3000 and pdo.vmax == 16000:
-                seen_15v = True
-                if 15.0 * pdo.i / 1000.0 != pdp:
-                    return False
-                # If we're at full power for this range, 9V Prog is optional
-                if pdp == 45:
-                    seen_9v = True
-        if pps and not (seen_9v and seen_15v):
-            return False
-    else:
-        # Above 45 W, make sure at least 3 A is available at 15V Prog, and the
-        # PDP is available at 20V Prog.
-        for pdo in pps:
-            # 5V and 9V Prog are optional at this power level
-            if pdo.vmin == 3000 and pdo.vmax == 16000:
-                seen_15v = True
-                if pdo.i < 3000.0:
-                    return False
-            elif pdo.vmin == 3000 and pdo.vmax == 21000:
-                seen_20v = True
-                if 20.0 * pdo.i / 1000.0 != pdp:
-                    return False
-                # If we have at least 60 W, 15V Prog is optional
-                if pdp >= 60:
-                    seen_15v = True
-        if pps and not (seen_15v and seen_20v):
+    # Check that the PPS APDOs look right in the same way.  Lower-voltage
+    # APDOs not listed in the rule are optional, and so are the 3 A ones
+    # once the PDP is high enough.
+    for max_pdp, min_3a_v, pdp_v, optional_pdp in _PPS_POWER_RULES:
+        if pdp <= max_pdp:
+            break
+    for v in min_3a_v:
+        for pdo in pps_by_v.get(v, ()):
+            if pdo.i < 3000:
+                return False
+    for pdo in pps_by_v.get(pdp_v, ()):
+        if pdp_v * pdo.i != pdp:
             return False
+    if pdp_v not in pps_by_v:
+        return False
+    if (not all(v in pps_by_v for v in min_3a_v)
+            and (optional_pdp is None or pdp < optional_pdp)):
+        return False
 
     return True
@@ -4,6 +4,12 @@ import argparse
 import sys
 import time
 
+try:
+    # pyudev lets us wait for the Sink to be flipped without polling
+    import pyudev
+except ImportError:
+    pyudev = None
+
 import pdbuddy
 
 
@@ -40,9 +46,14 @@ class SinkTester:
         """Notify the user that new configuration is being written"""
         print('Writing {v:.1f} V configuration object…'.format(v=cfg.v/1000.))
 
-    def _cfg_verify(self, sink, cfg):
-        """Verify that the given configuration is on the Sink"""
-        actual_cfg = sink.get_cfg()
+    def _cfg_verify(self, sink, cfg, actual_cfg=None):
+        """Verify that the given configuration is on the Sink
+
+        If ``actual_cfg`` is given, it's used instead of reading the
+        configuration from the Sink again.
+        """
+        if actual_cfg is None:
+            actual_cfg = sink.get_cfg()
         assert actual_cfg == cfg, ('Configuration error; expected config:\n'
                 '{cfg}\n'
                 'actual config:\n'
@@ -56,10 +67,9 @@ class SinkTester:
         """Write a SinkConfig to a Sink and verify that it was written"""
         self._pre_write(cfg)
 
-        sink.set_tmpcfg(cfg)
-        sink.write()
-
-        self._cfg_verify(sink, cfg)
+        # Write the configuration and read it back in as few round trips as
+        # possible
+        self._cfg_verify(sink, cfg, sink.write_cfg(cfg))
 
         self._post_write(cfg)
 
@@ -106,17 +116,67 @@ class SinkTester:
     def _alert_flip(self):
         print('Remove, flip, and re-insert the USB connector.')
 
-    def _flip(self):
-        self._alert_flip()
+    @staticmethod
+    def _is_sink(device):
+        """Test whether a udev device is a PD Buddy Sink"""
+        properties = device.properties
+        return (properties.get('ID_VENDOR_ID')
+                == '{:04x}'.format(pdbuddy.Sink.vid)
+                and properties.get('ID_MODEL_ID')
+                == '{:04x}'.format(pdbuddy.Sink.pid))
+
+    def _wait_flip_udev(self):
+        """Wait for the Sink to be disconnected and reconnected using udev"""
+        monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+        monitor.filter_by(subsystem='tty')
+        # Start listening before checking whether the Sink is present, so
+        # that no events can be missed in between
+        monitor.start()
+
+        # Wait for the Sink to be disconnected, unless it already has been
+        if self._sink_present():
+            for device in iter(monitor.poll, None):
+                if device.action == 'remove' and self._is_sink(device):
+                    break
+
+        # Wait for the Sink to be connected
+        for device in iter(monitor.poll, None):
+            if device.action == 'add' and self._is_sink(device):
+                break
+
+        # The list of devices has changed, so don't let it be reused
+        pdbuddy.Sink.invalidate_device_cache()
 
+    @staticmethod
+    def _sink_present():
+        """Test whether a Sink is connected right now"""
+        # Enumerate devices afresh rather than reusing a cached list
+        pdbuddy.Sink.invalidate_device_cache()
+        return len(list(pdbuddy.Sink.get_devices())) > 0
+
+    def _wait_flip_poll(self):
+        """Wait for the Sink to be disconnected and reconnected by polling"""
         # Wait for the Sink to be disconnected
-        while len(list(pdbuddy.Sink.get_devices())):
+        while self._sink_present():
             time.sleep(self.flip_poll)
 
         # Wait for the Sink to be connected
-        while not len(list(pdbuddy.Sink.get_devices())):
+        while not self._sink_present():
             time.sleep(self.flip_poll)
 
+    def _flip(self):
+        self._alert_flip()
+
+        # Use udev events if we can, falling back on polling otherwise
+        if pyudev is not None:
+            try:
+                self._wait_flip_udev()
+            except OSError:
+                # Most likely there's no netlink socket available
+                self._wait_flip_poll()
+        else:
+            self._wait_flip_poll()
+
         time.sleep(self.flip_delay)
 
     def _test_phase2(self, sink):
@@ -23,16 +23,17 @@ setup(
         "Operating System :: MacOS :: MacOS X",
         "Operating System :: Microsoft :: Windows",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 2.7",
-        "Programming Language :: Python :: 3.3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
         "Programming Language :: Python :: 3.6",
         "Topic :: Software Development :: User Interfaces"
     ],
+    python_requires=">=3.6",
     install_requires=[
-        "pyserial>=3,<4",
-        "aenum>=2;python_version<'3.6'"
+        "pyserial>=3,<4"
     ],
+    extras_require={
+        "udev": ["pyudev>=0.21"]
+    },
     test_suite="test_pdbuddy"
 )
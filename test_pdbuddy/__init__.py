@@ -1,71 +1,143 @@
 """Unit tests for the top-level pdbuddy classes"""
 
 import unittest
+from unittest import mock
 
 import pdbuddy
 
 
+class FakeSerial:
+    """Stand-in for `serial.Serial` that emulates the PD Buddy Sink shell
+
+    Each line written is echoed, followed by its answer and a prompt.  The
+    output becomes readable at most ``chunk`` bytes at a time, so answers
+    can be split across reads.  If ``silent`` is True, nothing is ever
+    printed, like a Sink that has stopped responding.
+    """
+
+    # Lines printed in answer to each command, looked up by the whole line
+    # and then by its first word.  Unknown commands get a "?" reply.
+    answers = {
+        b"clear_flags": [],
+        b"toggle_giveback": [],
+        b"set_v": [],
+        b"set_v 30000": [b"Error: invalid voltage"],
+        b"set_vrange": [],
+        b"set_i": [],
+        b"output": [b"disabled"],
+    }
+
+    chunk = 4096
+    silent = False
+
+    def __init__(self, port, baudrate=9600, timeout=None):
+        self.port = port
+        self.name = port
+        self.is_open = True
+        self.writes = []
+        self._out = bytearray()
+
+    def write(self, data):
+        self.writes.append(data)
+        if self.silent:
+            return
+        *lines, rest = data.split(b"\r\n")
+        for line in lines:
+            self._out += line + b"\r\n"
+            word = line.split(b" ", 1)[0]
+            answer = self.answers.get(line, self.answers.get(word))
+            if answer is None:
+                answer = [word + b" ?"]
+            for text in answer:
+                self._out += text + b"\r\n"
+            self._out += b"PDBS) "
+        if rest == b"\x04":
+            # ^D cancels the current line
+            self._out += b"^D\r\nPDBS) "
+
+    @property
+    def in_waiting(self):
+        return min(len(self._out), self.chunk)
+
+    def read(self, size=1):
+        data = bytes(self._out[:size])
+        del self._out[:size]
+        return data
+
+    def close(self):
+        self.is_open = False
+
+
 class SinkTestCase(unittest.TestCase):
 
-    def setUp(self):
-        # Get devices
+    @classmethod
+    def setUpClass(cls):
+        # Get devices once for all the tests
         pdbs_devices = list(pdbuddy.Sink.get_devices())
-        # If there are no devices, skip the test
+        # If there are no devices, skip the tests
         if len(pdbs_devices) == 0:
-            self.skipTest("No PD Buddy Sink devices found")
-        # Open the first device
-        self.pdbs = pdbuddy.Sink(pdbs_devices[0])
+            raise unittest.SkipTest("No PD Buddy Sink devices found")
+        # Use the first device
+        cls._device = pdbs_devices[0]
 
-        self.obj_valid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=3000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_gb = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_gb = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.GIVEBACK, v=15000, vmin=None,
                 vmax=None, i=3000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_range = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_range = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.HV_PREFERRED, v=13800, vmin=12000,
                 vmax=16000, i=2000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_p = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_p = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=35000, idim=pdbuddy.SinkDimension.POWER)
-        self.obj_valid_r = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_r = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=10000, idim=pdbuddy.SinkDimension.RESISTANCE)
 
-        self.obj_huge_v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_huge_v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=65536, vmin=None, vmax=None,
                 i=1000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_big_v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_big_v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=21001, vmin=None, vmax=None,
                 i=1000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_neg_v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_neg_v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=-1, vmin=None, vmax=None,
                 i=1000, idim=pdbuddy.SinkDimension.CURRENT)
 
-        self.obj_inv_range = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_inv_range = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.HV_PREFERRED, v=13800, vmin=16000,
                 vmax=12000, i=2000, idim=pdbuddy.SinkDimension.CURRENT)
 
-        self.obj_huge_i = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_huge_i = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=5000, vmin=None, vmax=None,
                 i=65536, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_big_i = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_big_i = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=5000, vmin=None, vmax=None,
                 i=5001, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_neg_i = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_neg_i = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=5000, vmin=None, vmax=None,
                 i=-1, idim=pdbuddy.SinkDimension.CURRENT)
 
-        self.obj_neg_p = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_neg_p = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=-1, idim=pdbuddy.SinkDimension.POWER)
-        self.obj_neg_r = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_neg_r = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=-1, idim=pdbuddy.SinkDimension.RESISTANCE)
 
-    def tearDown(self):
+        # Open the device once for all the tests
+        cls.pdbs = pdbuddy.Sink(cls._device)
+
+    @classmethod
+    def tearDownClass(cls):
         # Close the connection to the PD Buddy Sink
-        self.pdbs.close()
+        cls.pdbs.close()
+
+    def _reopen(self):
+        """Reopen the shared connection after a test has closed it"""
+        type(self).pdbs = pdbuddy.Sink(self._device)
 
     def test_identify(self):
         self.pdbs.identify()
@@ -84,6 +156,10 @@ class SinkTestCase(unittest.TestCase):
         self.pdbs.set_tmpcfg(self.obj_valid)
         self.assertEqual(self.pdbs.get_tmpcfg(), self.obj_valid)
 
+    def test_set_tmpcfg_no_pipeline(self):
+        self.pdbs.set_tmpcfg(self.obj_range, pipeline=False)
+        self.assertEqual(self.pdbs.get_tmpcfg(), self.obj_range)
+
     def test_set_tmpcfg_valid_gb(self):
         self.pdbs.set_tmpcfg(self.obj_valid_gb)
         self.assertEqual(self.pdbs.get_tmpcfg(), self.obj_valid_gb)
@@ -100,45 +176,39 @@ class SinkTestCase(unittest.TestCase):
         self.pdbs.set_tmpcfg(self.obj_valid_r)
         self.assertEqual(self.pdbs.get_tmpcfg(), self.obj_valid_r)
 
-    def test_set_tmpcfg_huge_v(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_huge_v)
-
-    def test_set_tmpcfg_big_v(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_big_v)
-
-    def test_set_tmpcfg_neg_v(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_neg_v)
-
-    def test_set_tmpcfg_inv_range(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_inv_range)
-
-    def test_set_tmpcfg_huge_i(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_huge_i)
-
-    def test_set_tmpcfg_big_i(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_big_i)
+    def test_set_tmpcfg_invalid(self):
+        for name, sc in (("huge_v", self.obj_huge_v),
+                ("big_v", self.obj_big_v),
+                ("neg_v", self.obj_neg_v),
+                ("inv_range", self.obj_inv_range),
+                ("huge_i", self.obj_huge_i),
+                ("big_i", self.obj_big_i),
+                ("neg_i", self.obj_neg_i),
+                ("neg_p", self.obj_neg_p),
+                ("neg_r", self.obj_neg_r)):
+            for pipeline in (True, False):
+                with self.subTest(name=name, pipeline=pipeline):
+                    with self.assertRaises(ValueError):
+                        self.pdbs.set_tmpcfg(sc, pipeline=pipeline)
+
+    def _write_valid(self):
+        """Write obj_valid to flash without checking anything"""
+        self.pdbs.set_tmpcfg(self.obj_valid)
+        self.pdbs.write()
 
-    def test_set_tmpcfg_neg_i(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_neg_i)
+    def test_write(self):
+        self._write_valid()
+        self.assertEqual(self.pdbs.get_cfg(), self.obj_valid)
 
-    def test_set_tmpcfg_neg_p(self):
-        with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_neg_p)
+    def test_write_cfg(self):
+        self.assertEqual(self.pdbs.write_cfg(self.obj_range), self.obj_range)
+        self.assertEqual(self.pdbs.get_cfg(), self.obj_range)
 
-    def test_set_tmpcfg_neg_r(self):
+    def test_write_cfg_invalid(self):
+        self._write_valid()
         with self.assertRaises(ValueError):
-            self.pdbs.set_tmpcfg(self.obj_neg_r)
-
-    def test_write(self):
-        self.test_set_tmpcfg_valid()
-        self.pdbs.write()
+            self.pdbs.write_cfg(self.obj_big_v)
+        # The invalid configuration shouldn't have been written to flash
         self.assertEqual(self.pdbs.get_cfg(), self.obj_valid)
 
     def test_get_cfg_index(self):
@@ -150,9 +220,9 @@ class SinkTestCase(unittest.TestCase):
 
     def test_load(self):
         # Write obj_valid to flash
-        self.test_write()
+        self._write_valid()
         # Write obj_valid_gb to tmpcfg
-        self.test_set_tmpcfg_valid_gb()
+        self.pdbs.set_tmpcfg(self.obj_valid_gb)
 
         self.assertNotEqual(self.pdbs.get_cfg(), self.pdbs.get_tmpcfg())
 
@@ -168,11 +238,30 @@ class SinkTestCase(unittest.TestCase):
 
     def test_context_manager(self):
         self.pdbs.close()
-        with pdbuddy.Sink(list(pdbuddy.Sink.get_devices())[0]) as pdbs:
+        self.addCleanup(self._reopen)
+        with pdbuddy.Sink(self._device) as pdbs:
             # Test something with the conext manager.  For example, this is
             # essentially test_get_cfg_index.
             self.assertIsInstance(pdbs.get_cfg(0), pdbuddy.SinkConfig)
 
+    def test_close_twice(self):
+        self.pdbs.close()
+        self.addCleanup(self._reopen)
+        self.pdbs.close()
+        self.assertFalse(self.pdbs._port.is_open)
+
+    def test_pooled(self):
+        self.pdbs.close()
+        self.addCleanup(self._reopen)
+        self.addCleanup(pdbuddy.Sink.shutdown_pool)
+        with pdbuddy.Sink(self._device, pooled=True) as pdbs:
+            port = pdbs._port
+        with pdbuddy.Sink(self._device, pooled=True) as pdbs:
+            self.assertIs(pdbs._port, port)
+            self.assertIsInstance(pdbs.get_cfg(0), pdbuddy.SinkConfig)
+        pdbuddy.Sink.shutdown_pool()
+        self.assertFalse(port.is_open)
+
     def test_output(self):
         try:
             self.pdbs.output = False
@@ -192,42 +281,213 @@ class SinkTestCase(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.pdbs.send_command("foo bar")
 
+    def test_send_commands(self):
+        self.pdbs.set_tmpcfg(self.obj_valid)
+        out = self.pdbs.send_commands(["clear_flags", "get_tmpcfg"])
+        self.assertEqual(out[0], [])
+        self.assertEqual(pdbuddy.SinkConfig.from_text(out[1]), self.obj_valid)
+
+    def test_send_commands_invalid(self):
+        with self.assertRaises(KeyError):
+            self.pdbs.send_commands(["clear_flags", "foo bar"])
 
-class SinkConfigTestCase(unittest.TestCase):
+
+class SinkIOTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Talk to a fake shell instead of a real Sink
+        patcher = mock.patch("serial.Serial", FakeSerial)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pdbs = pdbuddy.Sink("/dev/fake", low_latency=False)
+        self.addCleanup(self.pdbs.close)
+
+    def test_send_command(self):
+        self.assertEqual(self.pdbs.send_command("output"), [b"disabled"])
+
+    def test_send_commands(self):
+        writes = len(self.pdbs._port.writes)
+        self.assertEqual(self.pdbs.send_commands(["clear_flags", "output",
+                "set_i 1000"]), [[], [b"disabled"], []])
+        # All the commands went out in one write
+        self.assertEqual(len(self.pdbs._port.writes), writes + 1)
+
+    def test_send_commands_split(self):
+        # Hand out the answers a few bytes at a time
+        self.pdbs._port.chunk = 3
+        self.assertEqual(self.pdbs.send_commands(["clear_flags", "output",
+                "set_i 1000"]), [[], [b"disabled"], []])
+
+    def test_send_commands_empty(self):
+        writes = len(self.pdbs._port.writes)
+        self.assertEqual(self.pdbs.send_commands([]), [])
+        self.assertEqual(len(self.pdbs._port.writes), writes)
+
+    def test_send_commands_invalid(self):
+        with self.assertRaises(KeyError):
+            self.pdbs.send_commands(["clear_flags", "foo bar", "output"])
+
+    def test_send_commands_invalid_no_pipeline(self):
+        writes = len(self.pdbs._port.writes)
+        with self.assertRaises(KeyError):
+            self.pdbs.send_commands(["clear_flags", "foo bar", "output"],
+                    pipeline=False)
+        # Nothing was sent after the unknown command
+        self.assertEqual(self.pdbs._port.writes[writes:],
+                [b"clear_flags\r\n", b"foo bar\r\n"])
+
+    def test_set_tmpcfg_invalid(self):
+        valid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+                flags=pdbuddy.SinkFlags.NONE, v=15000, i=3000,
+                idim=pdbuddy.SinkDimension.CURRENT)
+        writes = len(self.pdbs._port.writes)
+        for name, sc in (("neg_v", valid._replace(v=-1)),
+                ("neg_vmin", valid._replace(vmin=-1, vmax=15000)),
+                ("neg_vmax", valid._replace(vmin=0, vmax=-1)),
+                ("inv_range", valid._replace(vmin=16000, vmax=14000)),
+                ("neg_i", valid._replace(i=-1)),
+                ("no_flags", valid._replace(flags=None))):
+            with self.subTest(name=name):
+                with self.assertRaises(ValueError):
+                    self.pdbs.set_tmpcfg(sc)
+        # Every one of them was rejected before anything was sent
+        self.assertEqual(len(self.pdbs._port.writes), writes)
+
+    def test_timeout(self):
+        self.pdbs._port.silent = True
+        with self.assertRaises(TimeoutError):
+            self.pdbs.send_command("output")
+
+    def _pooled_sink(self):
+        """Open a pooled Sink on the fake shell"""
+        self.addCleanup(pdbuddy.Sink.shutdown_pool)
+        return pdbuddy.Sink("/dev/fake", low_latency=False, pooled=True)
+
+    def test_pooled(self):
+        with self._pooled_sink() as pdbs:
+            port = pdbs._port
+        self.assertTrue(port.is_open)
+        writes = len(port.writes)
+        with self._pooled_sink() as pdbs:
+            self.assertIs(pdbs._port, port)
+        # The pooled port was used as-is, without resetting the shell
+        self.assertEqual(len(port.writes), writes)
+        pdbuddy.Sink.shutdown_pool()
+        self.assertFalse(port.is_open)
+
+    def test_pooled_dirty(self):
+        # A port that was written to without reading the whole answer isn't
+        # at a prompt, so it must not be pooled
+        with self._pooled_sink() as pdbs:
+            port = pdbs._port
+            port.silent = True
+            with self.assertRaises(TimeoutError):
+                pdbs.send_command("output")
+        self.assertFalse(port.is_open)
+        self.assertEqual(pdbuddy.Sink._pool, {})
+
+    def test_pooled_closed(self):
+        with self._pooled_sink() as pdbs:
+            port = pdbs._port
+        port.close()
+        with self._pooled_sink() as pdbs:
+            self.assertIsNot(pdbs._port, port)
+
+
+class GetDevicesTestCase(unittest.TestCase):
+
+    class OtherSink(pdbuddy.Sink):
+        vid = 0x1234
+        pid = 0x5678
 
     def setUp(self):
-        self.obj_none = pdbuddy.SinkConfig(status=None, flags=None, v=None,
-                vmin=None, vmax=None, i=None, idim=None)
-        self.obj_empty = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.EMPTY,
-                flags=None, v=None, vmin=None, vmax=None, i=None, idim=None)
-        self.obj_valid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        # Start and end with an empty cache, replacing device enumeration
+        # with a stub that records the patterns it was called with
+        pdbuddy.Sink.invalidate_device_cache()
+        self.addCleanup(pdbuddy.Sink.invalidate_device_cache)
+        self.patterns = []
+        patcher = mock.patch("serial.tools.list_ports.grep", self._grep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 100.0
+        # Replace pdbuddy's reference to the time module rather than
+        # time.monotonic itself, so the fake clock stays local to pdbuddy
+        patcher = mock.patch("pdbuddy.time",
+                mock.Mock(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _grep(self, pattern):
+        self.patterns.append(pattern)
+        return iter([pattern])
+
+    def test_cached(self):
+        self.assertEqual(list(pdbuddy.Sink.get_devices()), ["1209:9DB5"])
+        self.now += pdbuddy.Sink.device_cache_ttl / 2
+        self.assertEqual(list(pdbuddy.Sink.get_devices()), ["1209:9DB5"])
+        self.assertEqual(self.patterns, ["1209:9DB5"])
+
+    def test_ttl(self):
+        list(pdbuddy.Sink.get_devices())
+        self.now += pdbuddy.Sink.device_cache_ttl
+        list(pdbuddy.Sink.get_devices())
+        self.assertEqual(self.patterns, ["1209:9DB5", "1209:9DB5"])
+
+    def test_invalidate(self):
+        list(pdbuddy.Sink.get_devices())
+        list(self.OtherSink.get_devices())
+        pdbuddy.Sink.invalidate_device_cache()
+        list(pdbuddy.Sink.get_devices())
+        list(self.OtherSink.get_devices())
+        self.assertEqual(self.patterns,
+                ["1209:9DB5", "1234:5678", "1209:9DB5", "1234:5678"])
+
+    def test_subclass(self):
+        self.assertEqual(list(pdbuddy.Sink.get_devices()), ["1209:9DB5"])
+        self.assertEqual(list(self.OtherSink.get_devices()), ["1234:5678"])
+        self.assertEqual(list(pdbuddy.Sink.get_devices()), ["1209:9DB5"])
+        self.assertEqual(self.patterns, ["1209:9DB5", "1234:5678"])
+
+
+class SinkConfigTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.obj_none = pdbuddy.SinkConfig()
+        cls.obj_empty = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.EMPTY)
+        cls.obj_valid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=3000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_invalid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.INVALID,
+        cls.obj_invalid = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.INVALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=3000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_gb = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_gb = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.GIVEBACK, v=15000, vmin=None,
                 vmax=None, i=3000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_5v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_5v = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=5000, vmin=None, vmax=None,
                 i=3000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_1a = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_1a = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=1000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_range = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_range = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=12000, vmax=16000,
                 i=1000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_hv = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_hv = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.HV_PREFERRED, v=15000, vmin=12000,
                 vmax=16000, i=1000, idim=pdbuddy.SinkDimension.CURRENT)
-        self.obj_valid_10w = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_10w = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=10000, idim=pdbuddy.SinkDimension.POWER)
-        self.obj_valid_10r = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
+        cls.obj_valid_10r = pdbuddy.SinkConfig(status=pdbuddy.SinkStatus.VALID,
                 flags=pdbuddy.SinkFlags.NONE, v=15000, vmin=None, vmax=None,
                 i=10000, idim=pdbuddy.SinkDimension.RESISTANCE)
 
+    def test_defaults(self):
+        self.assertEqual(tuple(self.obj_none), (None,) * 7)
+        self.assertEqual(tuple(self.obj_empty),
+                (pdbuddy.SinkStatus.EMPTY,) + (None,) * 6)
+
     def test_str_none(self):
         self.assertEqual(str(self.obj_none), "No configuration")
 
@@ -264,6 +524,18 @@ class SinkConfigTestCase(unittest.TestCase):
                 "status: valid\nflags: HV_Preferred\nv: 15.000 V\n"
                 "vmin: 12.000 V\nvmax: 16.000 V\ni: 1.00 A")
 
+    def test_str_valid_gb_hv(self):
+        obj_valid_gb_hv = self.obj_valid_hv._replace(
+                flags=pdbuddy.SinkFlags.GIVEBACK
+                | pdbuddy.SinkFlags.HV_PREFERRED)
+        self.assertEqual(str(obj_valid_gb_hv),
+                "status: valid\nflags: GiveBack HV_Preferred\nv: 15.000 V\n"
+                "vmin: 12.000 V\nvmax: 16.000 V\ni: 1.00 A")
+        # Make sure the flags survive a round trip through from_text
+        self.assertEqual(pdbuddy.SinkConfig.from_text(
+                str(obj_valid_gb_hv).encode("utf-8").split(b"\n")),
+                obj_valid_gb_hv)
+
     def test_str_valid_10w(self):
         self.assertEqual(str(self.obj_valid_10w),
                 "status: valid\nflags: (none)\nv: 15.000 V\np: 10.00 W")
@@ -347,6 +619,27 @@ class SinkConfigTestCase(unittest.TestCase):
                 b"r: 10.00 \u03A9"])
         self.assertEqual(ft_valid_10r, self.obj_valid_10r)
 
+    def test_from_text_fractions(self):
+        ft_fractions = pdbuddy.SinkConfig.from_text([b"status: valid",
+                b"flags: (none)",
+                b"v: 3.300 V",
+                b"vmin: 0.500 V",
+                b"vmax: 20.000 V",
+                b"i: 0.05 A"])
+        self.assertEqual(ft_fractions, pdbuddy.SinkConfig(
+                status=pdbuddy.SinkStatus.VALID, flags=pdbuddy.SinkFlags.NONE,
+                v=3300, vmin=500, vmax=20000, i=50,
+                idim=pdbuddy.SinkDimension.CURRENT))
+
+        # More than three decimals are rounded, not truncated
+        ft_fractions = pdbuddy.SinkConfig.from_text([b"status: valid",
+                b"flags: (none)",
+                b"v: 4.9999 V",
+                b"i: 1.2346 A"])
+        self.assertEqual(ft_fractions, pdbuddy.SinkConfig(
+                status=pdbuddy.SinkStatus.VALID, flags=pdbuddy.SinkFlags.NONE,
+                v=5000, i=1235, idim=pdbuddy.SinkDimension.CURRENT))
+
     def test_from_text_invalid_index(self):
         with self.assertRaises(IndexError):
             pdbuddy.SinkConfig.from_text([b"Invalid index"])
@@ -363,12 +656,29 @@ class SinkConfigTestCase(unittest.TestCase):
                 b"i: 3.00 A"])
         self.assertEqual(ft_valid, self.obj_valid)
 
+    def test_from_text_many(self):
+        ftm = pdbuddy.SinkConfig.from_text_many(b"PDBS) get_cfg\r\n"
+                b"status: valid\r\n"
+                b"flags: (none)\r\n"
+                b"v: 15.000 V\r\n"
+                b"i: 3.00 A\r\n"
+                b"PDBS) set_v 5000\r\n"
+                b"PDBS) get_cfg 1\r\n"
+                b"No configuration\r\n"
+                b"PDBS) get_tmpcfg\r\n"
+                b"status: empty\r\n"
+                b"PDBS) get_cfg\r\n"
+                b"status: valid\r\n")
+        self.assertEqual(list(ftm), [self.obj_valid, self.obj_none,
+                self.obj_empty])
+
 
 class UnknownPDOTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.obj_zero = pdbuddy.UnknownPDO(value=0x00000000)
-        self.obj_notzero = pdbuddy.UnknownPDO(value=0xFFFFFFFF)
+    @classmethod
+    def setUpClass(cls):
+        cls.obj_zero = pdbuddy.UnknownPDO(value=0x00000000)
+        cls.obj_notzero = pdbuddy.UnknownPDO(value=0xFFFFFFFF)
 
     def test_str_zero(self):
         self.assertEqual(str(self.obj_zero), "00000000")
@@ -379,10 +689,11 @@ class UnknownPDOTestCase(unittest.TestCase):
 
 class SrcFixedPDOTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.obj_everything = pdbuddy.SrcFixedPDO(True, True, True, True, True,
+    @classmethod
+    def setUpClass(cls):
+        cls.obj_everything = pdbuddy.SrcFixedPDO(True, True, True, True, True,
                 True, 3, 20000, 5000)
-        self.obj_minimal = pdbuddy.SrcFixedPDO(False, False, False, False,
+        cls.obj_minimal = pdbuddy.SrcFixedPDO(False, False, False, False,
                 False, False, 0, 5000, 1500)
 
     def test_str_everything(self):
@@ -399,8 +710,9 @@ class SrcFixedPDOTestCase(unittest.TestCase):
 
 class SrcPPSAPDOTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.obj_15v = pdbuddy.SrcPPSAPDO(3000, 16000, 3000)
+    @classmethod
+    def setUpClass(cls):
+        cls.obj_15v = pdbuddy.SrcPPSAPDO(3000, 16000, 3000)
 
     def test_str_15v(self):
         self.assertEqual(str(self.obj_15v), "pps\n\tvmin: 3.00 V\n"
@@ -409,8 +721,9 @@ class SrcPPSAPDOTestCase(unittest.TestCase):
 
 class TypeCVirtualPDOTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.obj_1p5a = pdbuddy.TypeCVirtualPDO(1500)
+    @classmethod
+    def setUpClass(cls):
+        cls.obj_1p5a = pdbuddy.TypeCVirtualPDO(1500)
 
     def test_str_1p5a(self):
         self.assertEqual(str(self.obj_1p5a), "typec_virtual\n\ti: 1.50 A")
@@ -418,14 +731,16 @@ class TypeCVirtualPDOTestCase(unittest.TestCase):
 
 class ReadPDOTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.src_fixed_everything = pdbuddy.SrcFixedPDO(True, True, True, True,
+    @classmethod
+    def setUpClass(cls):
+        cls.src_fixed_everything = pdbuddy.SrcFixedPDO(True, True, True, True,
                 True, True, 3, 20000, 5000)
-        self.src_fixed_minimal = pdbuddy.SrcFixedPDO(False, False, False,
+        cls.src_fixed_minimal = pdbuddy.SrcFixedPDO(False, False, False,
                 False, False, False, 0, 5000, 1500)
-        self.unknown_zero = pdbuddy.UnknownPDO(value=0x00000000)
-        self.unknown_notzero = pdbuddy.UnknownPDO(value=0xFFFFFFFF)
-        self.typec_virtual = pdbuddy.TypeCVirtualPDO(1500)
+        cls.unknown_zero = pdbuddy.UnknownPDO(value=0x00000000)
+        cls.unknown_notzero = pdbuddy.UnknownPDO(value=0xFFFFFFFF)
+        cls.typec_virtual = pdbuddy.TypeCVirtualPDO(1500)
+        cls.src_pps = pdbuddy.SrcPPSAPDO(3300, 11000, 3000)
 
     def test_read_src_fixed_everything(self):
         rp_src_fixed_everything = pdbuddy.read_pdo([b"PDO 1: fixed",
@@ -465,21 +780,35 @@ class ReadPDOTestCase(unittest.TestCase):
                 b"\ti: 1.50 A"])
         self.assertEqual(self.typec_virtual, rp_typec_virtual)
 
+    def test_read_src_pps(self):
+        rp_src_pps = pdbuddy.read_pdo([b"PDO 2: pps",
+                b"\tvmin: 3.30 V",
+                b"\tvmax: 11.00 V",
+                b"\ti: 3.00 A"])
+        self.assertEqual(self.src_pps, rp_src_pps)
+
     def test_read_none(self):
         none_pdo = pdbuddy.read_pdo([b"No Source_Capabilities"])
         self.assertEqual(none_pdo, None)
 
+    def test_read_str(self):
+        for pdo in (self.src_fixed_everything, self.src_fixed_minimal,
+                self.unknown_notzero, self.typec_virtual, self.src_pps):
+            rp_pdo = pdbuddy.read_pdo(str(pdo).encode("utf-8").split(b"\n"))
+            self.assertEqual(pdo, rp_pdo)
+
 
 class ReadPDOListTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.src_fixed_everything = pdbuddy.SrcFixedPDO(True, True, True, True,
+    @classmethod
+    def setUpClass(cls):
+        cls.src_fixed_everything = pdbuddy.SrcFixedPDO(True, True, True, True,
                 True, True, 3, 20000, 5000)
-        self.src_fixed_minimal = pdbuddy.SrcFixedPDO(False, False, False,
+        cls.src_fixed_minimal = pdbuddy.SrcFixedPDO(False, False, False,
                 False, False, False, 0, 5000, 1500)
-        self.unknown_zero = pdbuddy.UnknownPDO(value=0x00000000)
-        self.unknown_notzero = pdbuddy.UnknownPDO(value=0xFFFFFFFF)
-        self.typec_virtual = pdbuddy.TypeCVirtualPDO(1500)
+        cls.unknown_zero = pdbuddy.UnknownPDO(value=0x00000000)
+        cls.unknown_notzero = pdbuddy.UnknownPDO(value=0xFFFFFFFF)
+        cls.typec_virtual = pdbuddy.TypeCVirtualPDO(1500)
 
     def test_read_pdo_list(self):
         # It's not a legal list for USB Power Delivery, but it works fine for
@@ -512,39 +841,46 @@ class ReadPDOListTestCase(unittest.TestCase):
 
 class PDOListCalculationsTestCase(unittest.TestCase):
 
-    def setUp(self):
-        self.src_fixed_5v_1p5a = pdbuddy.SrcFixedPDO(False, False, True,
+    @classmethod
+    def setUpClass(cls):
+        cls.src_fixed_5v_1p5a = pdbuddy.SrcFixedPDO(False, False, True,
                 False, False, False, 0, 5000, 1500)
-        self.src_fixed_5v_3a = pdbuddy.SrcFixedPDO(False, False, True, False,
+        cls.src_fixed_5v_3a = pdbuddy.SrcFixedPDO(False, False, True, False,
                 False, False, 0, 5000, 3000)
-        self.src_fixed_9v_1p6a = pdbuddy.SrcFixedPDO(False, False, False,
+        cls.src_fixed_9v_1p6a = pdbuddy.SrcFixedPDO(False, False, False,
                 False, False, False, 0, 9000, 1600)
-        self.src_fixed_9v_3a = pdbuddy.SrcFixedPDO(False, False, False, False,
+        cls.src_fixed_9v_3a = pdbuddy.SrcFixedPDO(False, False, False, False,
                 False, False, 0, 9000, 3000)
-        self.src_fixed_10v_1p5a = pdbuddy.SrcFixedPDO(False, False, False,
+        cls.src_fixed_10v_1p5a = pdbuddy.SrcFixedPDO(False, False, False,
                 False, False, False, 0, 10000, 1500)
-        self.src_fixed_12v_5a = pdbuddy.SrcFixedPDO(False, False, False, False,
+        cls.src_fixed_12v_5a = pdbuddy.SrcFixedPDO(False, False, False, False,
                 False, False, 0, 12000, 5000)
-        self.src_fixed_15v_1p8a = pdbuddy.SrcFixedPDO(False, False, False,
+        cls.src_fixed_15v_1p8a = pdbuddy.SrcFixedPDO(False, False, False,
                 False, False, False, 0, 15000, 1800)
-        self.src_fixed_15v_3a = pdbuddy.SrcFixedPDO(False, False, False, False,
+        cls.src_fixed_15v_3a = pdbuddy.SrcFixedPDO(False, False, False, False,
                 False, False, 0, 15000, 3000)
-        self.src_fixed_20v_2p25a = pdbuddy.SrcFixedPDO(False, False, False,
+        cls.src_fixed_20v_2p25a = pdbuddy.SrcFixedPDO(False, False, False,
                 False, False, False, 0, 20000, 2250)
-        self.src_fixed_20v_3a = pdbuddy.SrcFixedPDO(False, False, False, False,
+        cls.src_fixed_20v_3a = pdbuddy.SrcFixedPDO(False, False, False, False,
                 False, False, 0, 20000, 3000)
-        self.src_fixed_20v_5a = pdbuddy.SrcFixedPDO(False, False, False, False,
+        cls.src_fixed_20v_5a = pdbuddy.SrcFixedPDO(False, False, False, False,
                 False, False, 0, 20000, 5000)
-        self.src_pps_5v_1p5a = pdbuddy.SrcPPSAPDO(3000, 5900, 1500)
-        self.src_pps_5v_3a = pdbuddy.SrcPPSAPDO(3000, 5900, 3000)
-        self.src_pps_9v_1p6a = pdbuddy.SrcPPSAPDO(3000, 11000, 1600)
-        self.src_pps_9v_3a = pdbuddy.SrcPPSAPDO(3000, 11000, 3000)
-        self.src_pps_10v_1p5a = pdbuddy.SrcPPSAPDO(3000, 10000, 1500)
-        self.src_pps_15v_1p8a = pdbuddy.SrcPPSAPDO(3000, 16000, 1800)
-        self.src_pps_15v_3a = pdbuddy.SrcPPSAPDO(3000, 16000, 3000)
-        self.src_pps_20v_2p25a = pdbuddy.SrcPPSAPDO(3000, 21000, 2250)
-        self.src_pps_20v_5a = pdbuddy.SrcPPSAPDO(3000, 21000, 5000)
-        self.typec_virtual_1p5a = pdbuddy.TypeCVirtualPDO(1500)
+        cls.src_pps_5v_1p5a = pdbuddy.SrcPPSAPDO(3000, 5900, 1500)
+        cls.src_pps_5v_3a = pdbuddy.SrcPPSAPDO(3000, 5900, 3000)
+        cls.src_pps_9v_1p6a = pdbuddy.SrcPPSAPDO(3000, 11000, 1600)
+        cls.src_pps_9v_3a = pdbuddy.SrcPPSAPDO(3000, 11000, 3000)
+        cls.src_pps_10v_1p5a = pdbuddy.SrcPPSAPDO(3000, 10000, 1500)
+        cls.src_pps_15v_1p8a = pdbuddy.SrcPPSAPDO(3000, 16000, 1800)
+        cls.src_pps_15v_3a = pdbuddy.SrcPPSAPDO(3000, 16000, 3000)
+        cls.src_pps_20v_2p25a = pdbuddy.SrcPPSAPDO(3000, 21000, 2250)
+        cls.src_pps_20v_5a = pdbuddy.SrcPPSAPDO(3000, 21000, 5000)
+        cls.typec_virtual_1p5a = pdbuddy.TypeCVirtualPDO(1500)
+
+        # Fixed supply PDOs shared by many of the power rules tests, as
+        # required for each PDP up to the one in the name
+        cls.fixed_27w = (cls.src_fixed_5v_3a, cls.src_fixed_9v_3a)
+        cls.fixed_45w = cls.fixed_27w + (cls.src_fixed_15v_3a,)
+        cls.fixed_100w = cls.fixed_45w + (cls.src_fixed_20v_5a,)
 
     def test_calculate_pdp_typec_virtual(self):
         self.assertEqual(pdbuddy.calculate_pdp([self.typec_virtual_1p5a]), 7.5)
@@ -575,132 +911,86 @@ class PDOListCalculationsTestCase(unittest.TestCase):
                 self.src_fixed_12v_5a, self.src_fixed_20v_5a]), 100)
 
     def test_follows_power_rules_true(self):
-        # <= 15 W
-        self.assertTrue(pdbuddy.follows_power_rules([]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.typec_virtual_1p5a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_1p6a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-                self.src_pps_5v_1p5a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_pps_5v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_1p6a, self.src_pps_5v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_1p6a, self.src_pps_5v_3a,
-                self.src_pps_9v_1p6a]))
-        # <= 27 W
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_1p8a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_pps_9v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_pps_5v_3a, self.src_pps_9v_3a,
-                self.src_pps_15v_1p8a]))
-        # <= 45 W
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_2p25a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_pps_15v_3a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_pps_9v_3a, self.src_pps_15v_3a,
-                self.src_pps_20v_2p25a]))
-        # <= 100 W
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_10v_1p5a,
-                self.src_fixed_12v_5a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a, self.src_pps_20v_5a]))
-        self.assertTrue(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a, self.src_pps_9v_3a, self.src_pps_15v_3a,
-                self.src_pps_20v_5a]))
+        for pdo_list in (
+                # <= 15 W
+                (),
+                (self.typec_virtual_1p5a,),
+                (self.src_fixed_5v_1p5a,),
+                (self.src_fixed_5v_3a,),
+                (self.src_fixed_5v_3a, self.src_fixed_9v_1p6a),
+                (self.src_fixed_5v_1p5a, self.src_pps_5v_1p5a),
+                (self.src_fixed_5v_3a, self.src_pps_5v_3a),
+                (self.src_fixed_5v_3a, self.src_fixed_9v_1p6a,
+                    self.src_pps_5v_3a),
+                (self.src_fixed_5v_3a, self.src_fixed_9v_1p6a,
+                    self.src_pps_5v_3a, self.src_pps_9v_1p6a),
+                # <= 27 W
+                self.fixed_27w,
+                self.fixed_27w + (self.src_fixed_15v_1p8a,),
+                self.fixed_27w + (self.src_pps_9v_3a,),
+                self.fixed_27w + (self.src_pps_5v_3a, self.src_pps_9v_3a,
+                    self.src_pps_15v_1p8a),
+                # <= 45 W
+                self.fixed_45w,
+                self.fixed_45w + (self.src_fixed_20v_2p25a,),
+                self.fixed_45w + (self.src_pps_15v_3a,),
+                self.fixed_45w + (self.src_pps_9v_3a, self.src_pps_15v_3a,
+                    self.src_pps_20v_2p25a),
+                # <= 100 W
+                self.fixed_100w,
+                self.fixed_27w + (self.src_fixed_10v_1p5a,
+                    self.src_fixed_12v_5a, self.src_fixed_15v_3a,
+                    self.src_fixed_20v_5a),
+                self.fixed_100w + (self.src_pps_20v_5a,),
+                self.fixed_100w + (self.src_pps_9v_3a, self.src_pps_15v_3a,
+                    self.src_pps_20v_5a)):
+            with self.subTest(pdo_list=pdo_list):
+                self.assertTrue(pdbuddy.follows_power_rules(pdo_list))
 
     def test_follows_power_rules_false(self):
-        # <= 15 W
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_10v_1p5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-            self.src_fixed_10v_1p5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-            self.src_pps_5v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-            self.src_pps_9v_1p6a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-            self.src_pps_10v_1p5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-            self.src_pps_15v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-            self.src_pps_20v_2p25a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-            self.src_pps_5v_1p5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-            self.src_pps_9v_1p6a]))
-        # <= 27 W
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_9v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-                self.src_fixed_9v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_pps_5v_1p5a,
-                self.src_pps_9v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_pps_5v_3a,
-                self.src_pps_9v_1p6a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_1p6a, self.src_fixed_15v_1p8a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_pps_15v_1p8a]))
-        # <= 45 W
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_20v_2p25a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_pps_9v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_pps_9v_1p6a, self.src_pps_15v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_pps_9v_3a, self.src_pps_15v_1p8a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_1p6a, self.src_fixed_15v_3a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_1p8a,
-                self.src_fixed_20v_2p25a]))
-        # <= 100 W
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_20v_5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_3a, self.src_pps_20v_2p25a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_1p5a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_1p6a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_1p8a,
-                self.src_fixed_20v_5a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_12v_5a,
-                self.src_fixed_15v_3a, self.src_fixed_20v_2p25a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a, self.src_pps_15v_1p8a]))
-        self.assertFalse(pdbuddy.follows_power_rules([self.src_fixed_5v_3a,
-                self.src_fixed_9v_3a, self.src_fixed_15v_3a,
-                self.src_fixed_20v_5a, self.src_pps_15v_3a]))
+        for pdo_list in (
+                # <= 15 W
+                (self.src_fixed_10v_1p5a,),
+                (self.src_fixed_5v_1p5a, self.src_fixed_10v_1p5a),
+                (self.src_fixed_5v_1p5a, self.src_pps_5v_3a),
+                (self.src_fixed_5v_1p5a, self.src_pps_9v_1p6a),
+                (self.src_fixed_5v_1p5a, self.src_pps_10v_1p5a),
+                (self.src_fixed_5v_1p5a, self.src_pps_15v_3a),
+                (self.src_fixed_5v_1p5a, self.src_pps_20v_2p25a),
+                (self.src_fixed_5v_3a, self.src_pps_5v_1p5a),
+                (self.src_fixed_5v_3a, self.src_pps_9v_1p6a),
+                # <= 27 W
+                (self.src_fixed_9v_3a,),
+                (self.src_fixed_5v_1p5a, self.src_fixed_9v_3a),
+                self.fixed_27w + (self.src_pps_5v_1p5a, self.src_pps_9v_3a),
+                self.fixed_27w + (self.src_pps_5v_3a, self.src_pps_9v_1p6a),
+                (self.src_fixed_5v_3a, self.src_fixed_9v_1p6a,
+                    self.src_fixed_15v_1p8a),
+                self.fixed_27w + (self.src_pps_15v_1p8a,),
+                # <= 45 W
+                (self.src_fixed_20v_2p25a,),
+                (self.src_fixed_5v_1p5a, self.src_fixed_9v_3a,
+                    self.src_fixed_15v_3a),
+                self.fixed_45w + (self.src_pps_9v_3a,),
+                self.fixed_45w + (self.src_pps_9v_1p6a, self.src_pps_15v_3a),
+                self.fixed_45w + (self.src_pps_9v_3a, self.src_pps_15v_1p8a),
+                (self.src_fixed_5v_3a, self.src_fixed_9v_1p6a,
+                    self.src_fixed_15v_3a),
+                self.fixed_27w + (self.src_fixed_15v_1p8a,
+                    self.src_fixed_20v_2p25a),
+                # <= 100 W
+                (self.src_fixed_20v_5a,),
+                self.fixed_45w + (self.src_fixed_20v_3a,
+                    self.src_pps_20v_2p25a),
+                (self.src_fixed_5v_1p5a, self.src_fixed_9v_3a,
+                    self.src_fixed_15v_3a, self.src_fixed_20v_5a),
+                (self.src_fixed_5v_3a, self.src_fixed_9v_1p6a,
+                    self.src_fixed_15v_3a, self.src_fixed_20v_5a),
+                self.fixed_27w + (self.src_fixed_15v_1p8a,
+                    self.src_fixed_20v_5a),
+                self.fixed_27w + (self.src_fixed_12v_5a, self.src_fixed_15v_3a,
+                    self.src_fixed_20v_2p25a),
+                self.fixed_100w + (self.src_pps_15v_1p8a,),
+                self.fixed_100w + (self.src_pps_15v_3a,)):
+            with self.subTest(pdo_list=pdo_list):
+                self.assertFalse(pdbuddy.follows_power_rules(pdo_list))